@@ -0,0 +1,380 @@
+import cv2
+import csv
+import sys
+import time
+import queue
+import select
+import threading
+
+
+def time_since_epoch_millisec():
+    return int(round(time.time() * 1000))
+
+
+def get_available_resolutions(video_capture):
+    """Determine available resolutions for the camera"""
+    if not video_capture.isOpened():
+        print("Error: Video source is not open")
+        return None, None
+
+    max_width, max_height = 0, 0
+    available_resolutions = []
+
+    # Test a range of common resolutions (expandable)
+    test_widths = [640, 1280, 1920]  # [320, 640, 1280, 1920, 2560, 3840]
+    test_heights = [360, 720, 1080]  # [240, 360, 720, 1080, 1440, 2160]
+
+    for width, height in zip(test_widths, test_heights):
+        video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+        actual_width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        actual_height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        if (actual_width, actual_height) == (width, height):
+            available_resolutions.append((width, height))
+
+            # Track the highest resolution
+            if actual_width * actual_height > max_width * max_height:
+                max_width, max_height = actual_width, actual_height
+
+    return available_resolutions, (max_width, max_height)
+
+
+class CaptureEvents:
+    """Thread-safe flags shared by the capture loop, key handlers and
+    worker threads"""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.record = threading.Event()
+        self.capture = threading.Event()
+
+
+def start_recording(events):
+    if not events.record.is_set():
+        events.record.set()
+        print("\nRecording started")
+
+
+def request_capture(events):
+    events.capture.set()
+    print("\nCapture requested...")
+
+
+def request_stop(events):
+    events.stop.set()
+    print("\nStopping...")
+
+
+class FpsCounter:
+    """Instantaneous frame rate from the time between consecutive frames"""
+
+    def __init__(self):
+        self.old_time = 0
+        self.fps = 0.0
+
+    def update(self, new_time):
+        if self.old_time != 0 and new_time > self.old_time:
+            self.fps = 1000.0 / (new_time - self.old_time)
+        self.old_time = new_time
+        return self.fps
+
+
+class FramePacket:
+    """A captured frame travelling from the source through the stages to
+    the sinks.
+
+    Stages may attach extra data (e.g. tracker transforms) to data, and may
+    set display to show an annotated copy instead of the recorded frame.
+    """
+
+    def __init__(self, frame, timestamp, frame_no, recording):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.frame_no = frame_no
+        self.recording = recording
+        self.display = None
+        self.data = {}
+
+
+class CameraSource:
+    """Video capture device opened at the requested or largest resolution.
+
+    With strict set, the device must deliver exactly the selected
+    resolution; otherwise whatever resolution it settles on is used.
+    """
+
+    def __init__(self, device_index, width=None, height=None, strict=False):
+        self.device_index = device_index
+        self.frame_size = (width, height)
+        self.strict = strict
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.device_index)
+        if not self.cap.isOpened():
+            print("Error opening video stream")
+            return False
+
+        available_res, best_res = get_available_resolutions(self.cap)
+        print(f"Available resolutions: {available_res}")
+
+        if self.frame_size not in available_res:
+            print(f"frame width or height {self.frame_size}\
+ not provided/available, automatically picking the largest size")
+            self.frame_size = best_res
+        frame_width, frame_height = self.frame_size
+        # None of the tested resolutions are supported: keep the device default
+        if frame_width and frame_height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, frame_width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_height)
+
+        frame_width_act = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height_act = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if self.strict:
+            assert(frame_width == frame_width_act)
+            assert(frame_height == frame_height_act)
+        self.frame_size = (frame_width_act, frame_height_act)
+
+        print(f"Resolution selected: {frame_width_act} x {frame_height_act}")
+        return True
+
+    def read(self):
+        return self.cap.read()
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class VideoSink:
+    """MJPG video of the recorded frames, with a CSV logging the frame
+    number and timestamp of each one"""
+
+    def __init__(self, output_filename, fps):
+        self.output_filename = output_filename
+        self.fps = fps
+        self.csvfile = None
+        self.csv_writer = None
+        self.video_writer = None
+        self.written = 0
+
+    def open(self, frame_size):
+        self.csvfile = open(f"{self.output_filename}.csv", "w", newline='')
+        self.csv_writer = csv.writer(self.csvfile)
+        self.video_writer = cv2.VideoWriter(
+            f"{self.output_filename}.avi",
+            cv2.VideoWriter_fourcc(*'MJPG'),
+            self.fps,
+            frame_size
+            )
+
+    def write(self, packet):
+        if not packet.recording:
+            return
+        self.video_writer.write(packet.frame)
+        self.csv_writer.writerow([packet.frame_no, packet.timestamp])
+        self.written += 1
+
+    def close(self):
+        if self.video_writer is not None:
+            self.video_writer.release()
+        if self.csvfile is not None:
+            self.csvfile.close()
+
+
+class ThreadedSink:
+    """Runs another sink's writes on a background thread, so encoding and
+    disk I/O do not hold up the capture loop.
+
+    Packets are buffered in a bounded queue; when it is full the capture
+    loop waits rather than dropping frames. Unless max_queue is given, the
+    queue holds as many raw frames as fit in buffer_mb. An error on the
+    writer thread is raised again from the next write or from close.
+    """
+
+    def __init__(self, sink, buffer_mb=256, max_queue=None):
+        self.sink = sink
+        self.buffer_mb = buffer_mb
+        self.max_queue = max_queue
+        self.queue = None
+        self.thread = None
+        self.error = None
+        self.max_depth = 0
+
+    @property
+    def written(self):
+        return self.sink.written
+
+    def open(self, frame_size):
+        max_queue = self.max_queue
+        if max_queue is None:
+            frame_bytes = max(frame_size[0] * frame_size[1] * 3, 1)
+            max_queue = max(self.buffer_mb * 1024 * 1024 // frame_bytes, 1)
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        self.sink.open(frame_size)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                packet = self.queue.get()
+                if packet is None:
+                    break
+                self.sink.write(packet)
+        except Exception as e:
+            self.error = e
+
+    def _put(self, item):
+        """Queue an item, giving up if the writer thread has stopped"""
+        while self.thread.is_alive():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def write(self, packet):
+        if not self._put(packet) or self.error is not None:
+            raise RuntimeError(f"{type(self.sink).__name__} failed") from self.error
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def close(self):
+        if self.thread is not None:
+            self._put(None)
+            self.thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise RuntimeError(f"{type(self.sink).__name__} failed") from self.error
+
+
+def fps_overlay(packet, engine):
+    """Stage drawing the current FPS on the displayed frame only"""
+    packet.display = packet.frame.copy()
+    cv2.putText(packet.display, f"FPS: {engine.fps_counter.fps:.2f}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    return packet
+
+
+class CaptureEngine:
+    """Capture loop running a source -> processing stages -> sinks pipeline.
+
+    Stages are callables taking (packet, engine) and returning the packet,
+    or None to drop it. Sinks provide open(frame_size), write(packet) and
+    close(). Keys pressed in the preview window (or on stdin, if enabled)
+    call the bound handler with the engine's CaptureEvents.
+    """
+
+    def __init__(self, source, stages=(), sinks=(), key_bindings=None,
+                 window_name="Frame", print_status=True, listen_stdin=False):
+        self.source = source
+        self.stages = list(stages)
+        self.sinks = list(sinks)
+        self.key_bindings = {27: request_stop}  # ESC key
+        self.key_bindings.update(key_bindings or {})
+        self.window_name = window_name
+        self.print_status = print_status
+        self.listen_stdin = listen_stdin
+
+        self.events = CaptureEvents()
+        self.fps_counter = FpsCounter()
+        self.frames = 0
+        self.frame_no = 0
+        self.start_time = None
+
+    def handle_key(self, key):
+        handler = self.key_bindings.get(key)
+        if handler is not None:
+            handler(self.events)
+
+    def _stdin_listener(self):
+        """Thread mapping key presses on the terminal to the key bindings"""
+        while not self.events.stop.is_set():
+            if select.select([sys.stdin], [], [], 0.01)[0]:  # Non-blocking key check
+                key = sys.stdin.read(1).strip().lower()
+                if key:
+                    self.handle_key(ord(key))
+
+    def _process(self, frame):
+        timestamp = time_since_epoch_millisec()
+        fps = self.fps_counter.update(timestamp)
+        recording = self.events.record.is_set()
+
+        packet = FramePacket(frame, timestamp, self.frame_no, recording)
+        for stage in self.stages:
+            packet = stage(packet, self)
+            if packet is None:
+                return None
+
+        for sink in self.sinks:
+            sink.write(packet)
+
+        self.frames += 1
+        if recording:
+            self.frame_no += 1
+        if self.print_status:
+            print(f"\r{'Recording ' if recording else ''}FPS: {fps:.2f}", end="\r")
+        return packet
+
+    def run(self):
+        if not self.source.open():
+            self.source.close()
+            return
+
+        self.start_time = time_since_epoch_millisec()
+        try:
+            for sink in self.sinks:
+                sink.open(self.source.frame_size)
+
+            if self.listen_stdin:
+                threading.Thread(target=self._stdin_listener, daemon=True).start()
+
+            while not self.events.stop.is_set():
+                ret, frame = self.source.read()
+                if not ret:
+                    print("Error: Failed to capture frame")
+                    break
+
+                packet = self._process(frame)
+                if packet is not None:
+                    # Display the resulting frame
+                    cv2.imshow(self.window_name,
+                               packet.frame if packet.display is None else packet.display)
+
+                key = cv2.waitKey(1)
+                if key != -1:
+                    self.handle_key(key & 0xFF)
+
+        except KeyboardInterrupt:
+            print("\nCapture stopped by user.")
+
+        finally:
+            print()
+            # Release everything when done
+            self.events.stop.set()
+            errors = []
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except Exception as e:
+                    errors.append(e)
+            self.source.close()
+            cv2.destroyAllWindows()
+            self.print_metrics()
+            # Cleanup is done; surface a sink failure unless already raising
+            if errors and sys.exc_info()[0] is None:
+                raise errors[0]
+
+    def print_metrics(self):
+        elapsed = (time_since_epoch_millisec() - self.start_time) / 1000.0
+        if self.frames and elapsed > 0:
+            print(f"Captured {self.frames} frames ({self.frame_no} recorded),\
+ average {self.frames / elapsed:.2f} FPS")
+        for sink in self.sinks:
+            if isinstance(sink, ThreadedSink):
+                print(f"{type(sink.sink).__name__}: {sink.written} written,\
+ peak queue depth {sink.max_depth}")
@@ -0,0 +1,286 @@
+import os
+import csv
+import struct
+import argparse
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npy"
+FRAME_CHUNK_TYPES = (b"dc", b"db")  # compressed / uncompressed video data
+MISSING_FRAME = -1  # offset of a dropped frame with no earlier frame to repeat
+
+
+def index_path_for(avi_path):
+    """Path of the persistent frame index stored next to the video"""
+    return avi_path + INDEX_SUFFIX
+
+
+def timestamps_path_for(avi_path):
+    """Path of the timestamp CSV written by the Data Logger for this video"""
+    return os.path.splitext(avi_path)[0] + ".csv"
+
+
+def _scan_list(f, start, end, offsets, sizes, in_movi):
+    """Walk the chunks between start and end, collecting video frames."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, size = struct.unpack("<4sI", header)
+
+        if chunk_id == b"LIST":
+            list_type = f.read(4)
+            list_end = pos + 8 + size
+            # A recording that was not released cleanly leaves a 0 size
+            if size == 0 or list_end > end:
+                list_end = end
+            if list_type in (b"movi", b"rec "):
+                _scan_list(f, pos + 12, list_end, offsets, sizes, True)
+            pos = list_end + (size & 1)
+            continue
+
+        if in_movi and chunk_id[2:] in FRAME_CHUNK_TYPES:
+            if pos + 8 + size > end:
+                break  # truncated frame at the end of the file
+            if size == 0:
+                # Dropped frame: the player repeats the previous one. A
+                # placeholder keeps later frames aligned with the logger CSV.
+                offsets.append(offsets[-1] if offsets else MISSING_FRAME)
+                sizes.append(sizes[-1] if sizes else 0)
+            else:
+                offsets.append(pos + 8)
+                sizes.append(size)
+
+        pos += 8 + size + (size & 1)
+
+
+def scan_avi(avi_path):
+    """Scan an AVI file once and return an (N, 2) array of the byte offset
+    and size of every video frame, in presentation order. A dropped first
+    frame is recorded as (MISSING_FRAME, 0).
+
+    Both the plain RIFF 'AVI ' list and OpenDML 'AVIX' extensions (written
+    for files over 1 GB) are walked, so long recordings are fully indexed.
+    """
+    offsets, sizes = [], []
+    file_size = os.path.getsize(avi_path)
+
+    with open(avi_path, "rb") as f:
+        pos = 0
+        while pos + 12 <= file_size:
+            f.seek(pos)
+            riff_id, size, form_type = struct.unpack("<4sI4s", f.read(12))
+            if riff_id != b"RIFF" or form_type not in (b"AVI ", b"AVIX"):
+                break
+            riff_end = pos + 8 + size
+            if size == 0 or riff_end > file_size:
+                riff_end = file_size
+            _scan_list(f, pos + 12, riff_end, offsets, sizes, False)
+            pos = riff_end + (size & 1)
+
+    return np.array([offsets, sizes], dtype=np.int64).T.reshape(-1, 2)
+
+
+def build_index(avi_path, force=False):
+    """Load the frame index for a video, (re)building it if it is missing
+    or older than the video itself."""
+    index_path = index_path_for(avi_path)
+
+    if (not force and os.path.exists(index_path)
+            and os.path.getmtime(index_path) >= os.path.getmtime(avi_path)):
+        return np.load(index_path)
+
+    index = scan_avi(avi_path)
+    np.save(index_path, index)
+    return index
+
+
+def load_timestamps(csv_path, n_frames):
+    """Read the Data Logger's (frame_no, timestamp) CSV into an array of
+    timestamps in milliseconds indexed by frame number.
+
+    Frames past the last logged row (e.g. after a crash) have no timestamp
+    and are left off the end. A missing or repeated frame number in between
+    would misalign every later timestamp, so it raises a ValueError.
+    """
+    timestamps = {}
+    with open(csv_path, newline='') as csvfile:
+        for row in csv.reader(csvfile):
+            if len(row) < 2:
+                continue
+            frame_no = int(row[0])
+            if frame_no in timestamps:
+                raise ValueError(f"frame {frame_no} is logged twice in {csv_path}")
+            if 0 <= frame_no < n_frames:
+                timestamps[frame_no] = int(row[1])
+
+    missing = sorted(set(range(len(timestamps))) - set(timestamps))
+    if missing:
+        raise ValueError(f"frames {missing[:10]} have no timestamp in {csv_path}")
+    return np.array([timestamps[i] for i in range(len(timestamps))], dtype=np.int64)
+
+
+class FrameReader:
+    """Random-access reader for an MJPG AVI file.
+
+    Every MJPG frame is an independent JPEG, so a frame is fetched with a
+    single seek into the file followed by one decode. Recently decoded
+    frames are kept in a small LRU cache for scrubbing back and forth.
+    """
+
+    def __init__(self, avi_path, timestamps_path=None, cache_size=64):
+        self.avi_path = avi_path
+        self.index = build_index(avi_path)
+        self.cache_size = cache_size
+
+        self._file = open(avi_path, "rb")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+        if timestamps_path is None:
+            timestamps_path = timestamps_path_for(avi_path)
+        self.timestamps = None
+        if os.path.exists(timestamps_path):
+            self.timestamps = load_timestamps(timestamps_path, len(self))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.get_frame(i) for i in range(*key.indices(len(self)))]
+        return self.get_frame(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._cache.clear()
+
+    def read_bytes(self, frame_no):
+        """Return the raw JPEG bytes of a frame without decoding it"""
+        if frame_no < 0:
+            frame_no += len(self)
+        if not 0 <= frame_no < len(self):
+            raise IndexError(f"frame {frame_no} out of range (0-{len(self) - 1})")
+
+        offset, size = self.index[frame_no]
+        if offset == MISSING_FRAME:
+            raise IndexError(f"frame {frame_no} was dropped during recording and has no data")
+        with self._lock:
+            self._file.seek(int(offset))
+            return self._file.read(int(size))
+
+    def get_frame(self, frame_no):
+        """Return the decoded BGR image of a frame (read-only)"""
+        if frame_no < 0:
+            frame_no += len(self)
+
+        with self._lock:
+            frame = self._cache.get(frame_no)
+            if frame is not None:
+                self._cache.move_to_end(frame_no)
+                return frame
+
+        data = self.read_bytes(frame_no)
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"frame {frame_no} of {self.avi_path} could not be decoded")
+        # Cached frames are shared between callers; copy before drawing on one
+        frame.flags.writeable = False
+
+        with self._lock:
+            self._cache[frame_no] = frame
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return frame
+
+    def _require_timestamps(self):
+        if self.timestamps is None:
+            raise ValueError(f"no timestamp CSV found for {self.avi_path}")
+
+    def frame_number_at(self, timestamp):
+        """Number of the last frame recorded at or before timestamp (ms)"""
+        self._require_timestamps()
+        if len(self.timestamps) == 0 or timestamp < self.timestamps[0]:
+            raise IndexError(f"timestamp {timestamp} is before the start of {self.avi_path}")
+        return int(np.searchsorted(self.timestamps, timestamp, side="right")) - 1
+
+    def frame_range(self, start_time, end_time):
+        """Frame numbers recorded within [start_time, end_time] (ms)"""
+        self._require_timestamps()
+        first = np.searchsorted(self.timestamps, start_time, side="left")
+        last = np.searchsorted(self.timestamps, end_time, side="right")
+        return range(int(first), int(last))
+
+    def frames_between(self, start_time, end_time):
+        """Yield (frame_no, timestamp, frame) for every frame recorded
+        within [start_time, end_time] (ms)"""
+        for frame_no in self.frame_range(start_time, end_time):
+            yield frame_no, int(self.timestamps[frame_no]), self.get_frame(frame_no)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a random-access frame index for a recorded\
+            MJPG video, and optionally extract a single frame"
+        )
+    parser.add_argument(
+        "avi_file",
+        type=str,
+        help="Video recorded by the Data Logger")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rescan the video even if an up-to-date index exists")
+    parser.add_argument(
+        "--frame",
+        type=int,
+        default=None,
+        help="Frame number to extract")
+    parser.add_argument(
+        "--time",
+        type=int,
+        default=None,
+        help="Timestamp (ms since epoch) to extract the frame at")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Image file to save the extracted frame to. If left empty,\
+            the frame is displayed instead")
+
+    args = parser.parse_args()
+
+    index = build_index(args.avi_file, force=args.rebuild)
+    print(f"Indexed {len(index)} frames in {args.avi_file}")
+
+    if args.frame is None and args.time is None:
+        return
+
+    with FrameReader(args.avi_file) as reader:
+        frame_no = args.frame
+        if frame_no is None:
+            frame_no = reader.frame_number_at(args.time)
+        frame = reader.get_frame(frame_no)
+
+        if args.output:
+            cv2.imwrite(args.output, frame)
+            print(f"Frame {frame_no} saved to {args.output}")
+        else:
+            cv2.imshow(f"Frame {frame_no}", frame)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,288 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # figures are written to files, never shown
 import matplotlib.pyplot as plt
 from statsmodels.stats.power import TTestIndPower
 
-def cohens_d(x1, x2):
-    n1, n2 = len(x1), len(x2)
-    pooled_sd = np.sqrt(
-        ((n1 - 1)*np.std(x1, ddof=1)**2 + (n2 - 1)*np.std(x2, ddof=1)**2) / (n1 + n2 - 2)
-    )
-    return (np.mean(x1) - np.mean(x2)) / pooled_sd
+from resampling import (
+    cohens_d_from_stats,
+    resample_comparisons,
+    DEFAULT_RESAMPLES,
+    DEFAULT_CONFIDENCE,
+)
 
-def filter_group(df, task, expertise, guidance):
-    return df[
-        (df['Task Type'] == task) &
-        (df['Expertise Level'] == expertise) &
-        (df['Guidance Type'] == guidance)
-    ]
+GROUP_COLUMNS = ['Task Type', 'Expertise Level', 'Guidance Type']
+SAMPLE_SIZES = np.arange(5, 101)
+ALPHA = 0.05
+TARGET_POWER = 0.8
+MIN_GROUP_SIZE = 2
+METRIC_COLUMN = 'Percentage AOI'  # compute_aoi.py writes 'Percentage AOI Dwell' instead
+
+# Comparison direction: group 1 is the cell listed first, d = group 1 - group 2.
+# Levels not listed here come after the listed ones, alphabetically.
+EXPERTISE_ORDER = ['expert', 'novice']
+GUIDANCE_ORDER = ['selfgaze', 'guided', 'unguided']
 
-def power_curve_plot(effect_size, label):
-    analysis = TTestIndPower()
-    sample_sizes = np.arange(5, 101)
-    powers = analysis.power(effect_size=effect_size, nobs1=sample_sizes, alpha=0.05)
 
-    required_n = analysis.solve_power(effect_size=effect_size, power=0.8, alpha=0.05)
+def required_sample_size(effect_size, analysis=None):
+    """Samples per group needed to reach TARGET_POWER, or NaN if the effect
+    size is zero or undefined."""
+    if not np.isfinite(effect_size) or effect_size == 0:
+        return np.nan
+    analysis = analysis or TTestIndPower()
+    try:
+        return analysis.solve_power(effect_size=abs(effect_size), power=TARGET_POWER, alpha=ALPHA)
+    except ValueError:
+        return np.nan
 
-    plt.figure(figsize=(8, 5))
-    plt.plot(sample_sizes, powers, label=f'd = {effect_size:.2f}')
-    plt.axhline(0.8, color='red', linestyle='--', label='Power = 0.8')
-    plt.axvline(required_n, color='green', linestyle='--', label=f'n ≈ {required_n:.0f}')
+def power_curve_plot(effect_size, label, output_path, powers=None, required_n=None, power_band=None):
+    if powers is None:
+        powers = TTestIndPower().power(effect_size=abs(effect_size), nobs1=SAMPLE_SIZES, alpha=ALPHA)
+    if required_n is None:
+        required_n = required_sample_size(effect_size)
+
+    fig = plt.figure(figsize=(8, 5))
+    plt.plot(SAMPLE_SIZES, powers, label=f'd = {effect_size:.2f}')
+    if power_band is not None:
+        plt.fill_between(SAMPLE_SIZES, power_band[0], power_band[1], alpha=0.2,
+                         label=f'{DEFAULT_CONFIDENCE:.0%} CI of d')
+    plt.axhline(TARGET_POWER, color='red', linestyle='--', label=f'Power = {TARGET_POWER}')
+    if np.isfinite(required_n):
+        plt.axvline(required_n, color='green', linestyle='--', label=f'n ≈ {required_n:.0f}')
     plt.title(f'Power Curve for {label}')
     plt.xlabel('Sample Size per Group')
     plt.ylabel('Power')
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    fig.savefig(output_path)
+    plt.close(fig)
+    return output_path
 
-    print(f"\nPower analysis for {label}: need ~{required_n:.0f} samples per group for 80% power.\n")
+def _render_power_curve(job):
+    return power_curve_plot(*job)
 
-def main(xlsx_file):
-    df = pd.read_excel(xlsx_file, engine='openpyxl')
+def load_data(xlsx_file, column=METRIC_COLUMN):
+    # CSV output of compute_aoi.py is accepted as well as the spreadsheet
+    if xlsx_file.lower().endswith('.csv'):
+        df = pd.read_csv(xlsx_file)
+    else:
+        df = pd.read_excel(xlsx_file, engine='openpyxl')
     df.columns = df.columns.str.strip()
 
-    # Normalize for filtering
-    df['Task Type'] = df['Task Type'].astype(str).str.strip().str.lower()
-    df['Expertise Level'] = df['Expertise Level'].astype(str).str.strip().str.lower()
-    df['Guidance Type'] = df['Guidance Type'].astype(str).str.strip().str.lower()
+    # Rows missing a study cell label belong to no comparison
+    df = df.dropna(subset=GROUP_COLUMNS)
+
+    # Normalize for grouping
+    for group_column in GROUP_COLUMNS:
+        df[group_column] = df[group_column].astype(str).str.strip().str.lower()
 
-    df['Percentage AOI'] = pd.to_numeric(df['Percentage AOI'], errors='coerce')
+    df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+def group_stats(df, column=METRIC_COLUMN):
+    """Size, mean and sample variance of the metric column for every study
+    cell, computed in a single groupby pass."""
+    return (
+        df.dropna(subset=[column])
+        .groupby(GROUP_COLUMNS)[column]
+        .agg(n='count', mean='mean', var='var')
+        .reset_index()
+    )
 
-    comparisons = [
-        ("ablating", "expert", "selfgaze", "novice", "guided"),
-        ("scoping", "expert", "selfgaze", "novice", "guided"),
+def _level_rank(level, order):
+    return (order.index(level), '') if level in order else (len(order), level)
+
+def cell_order(expertise, guidance):
+    """Sort key fixing which cell of a comparison is group 1"""
+    return _level_rank(expertise, EXPERTISE_ORDER) + _level_rank(guidance, GUIDANCE_ORDER)
+
+def pairwise_effect_sizes(stats):
+    """Cohen's d, required n and power curves for every pair of cells that
+    share a task type. d is group 1 minus group 2, as recorded in the
+    Direction column.
+
+    Returns the results table and a (comparisons x SAMPLE_SIZES) power array
+    aligned with its rows.
+    """
+    pairs = stats.merge(stats, on='Task Type', suffixes=(' 1', ' 2'))
+
+    # Keep each unordered pair once, with group 1 the cell that comes first
+    # in EXPERTISE_ORDER, then GUIDANCE_ORDER
+    first = [cell_order(e, g) for e, g in zip(pairs['Expertise Level 1'], pairs['Guidance Type 1'])]
+    second = [cell_order(e, g) for e, g in zip(pairs['Expertise Level 2'], pairs['Guidance Type 2'])]
+    keep = np.array([a < b for a, b in zip(first, second)], dtype=bool)
+    pairs = pairs[keep].reset_index(drop=True)
+    pairs['Direction'] = [
+        f"d > 0: {row['Expertise Level 1']}({row['Guidance Type 1']}) higher than"
+        f" {row['Expertise Level 2']}({row['Guidance Type 2']})"
+        for _, row in pairs.iterrows()
     ]
 
-    for task, exp1, guide1, exp2, guide2 in comparisons:
-        g1 = filter_group(df, task, exp1, guide1)
-        g2 = filter_group(df, task, exp2, guide2)
+    n1, n2 = pairs['n 1'].to_numpy(), pairs['n 2'].to_numpy()
+    enough = (n1 >= MIN_GROUP_SIZE) & (n2 >= MIN_GROUP_SIZE)
+
+    d = cohens_d_from_stats(pairs['mean 1'].to_numpy(), pairs['var 1'].to_numpy(), n1,
+                            pairs['mean 2'].to_numpy(), pairs['var 2'].to_numpy(), n2)
+    d = np.where(enough, d, np.nan)
+    pairs["Cohen's d"] = d
+
+    analysis = TTestIndPower()
+    powers = np.full((len(pairs), len(SAMPLE_SIZES)), np.nan)
+    valid = np.isfinite(d) & (d != 0)
+    if valid.any():
+        powers[valid] = analysis.power(
+            effect_size=np.abs(d[valid])[:, None], nobs1=SAMPLE_SIZES[None, :], alpha=ALPHA
+        )
+    pairs['Required n'] = [required_sample_size(value, analysis) for value in d]
+
+    return pairs, powers
+
+def group_values(df, column=METRIC_COLUMN):
+    """Metric column observations of every study cell, keyed like the rows
+    of group_stats."""
+    values = df.dropna(subset=[column]).groupby(GROUP_COLUMNS)[column]
+    return {key: group.to_numpy() for key, group in values}
+
+def power_bands(ci_low, ci_high):
+    """Lower and upper power curves over SAMPLE_SIZES for effect sizes
+    anywhere within each confidence interval of d."""
+    ci_low, ci_high = np.asarray(ci_low, dtype=float), np.asarray(ci_high, dtype=float)
+    smallest = np.where((ci_low <= 0) & (ci_high >= 0), 0.0,
+                        np.minimum(np.abs(ci_low), np.abs(ci_high)))
+    largest = np.maximum(np.abs(ci_low), np.abs(ci_high))
+
+    return _power_at(smallest), _power_at(largest)
+
+def _power_at(effect_sizes):
+    """Power over SAMPLE_SIZES for each effect size; an infinite effect size
+    has power 1 and NaN stays NaN."""
+    powers = np.full((len(effect_sizes), len(SAMPLE_SIZES)), np.nan)
+    powers[np.isinf(effect_sizes)] = 1.0
+    finite = np.isfinite(effect_sizes)
+    if finite.any():
+        powers[finite] = TTestIndPower().power(effect_size=effect_sizes[finite][:, None],
+                                               nobs1=SAMPLE_SIZES[None, :], alpha=ALPHA)
+    return powers
+
+def add_uncertainty(results, values, executor, n_resamples=DEFAULT_RESAMPLES, seed=None):
+    """Bootstrap CI and permutation p-value of d for every comparison with a
+    defined (possibly infinite) effect size, resampled in parallel across comparisons.
+
+    Returns the (lower, upper) power bands aligned with the rows of results.
+    """
+    # Infinite d (constant groups with different means) is still resampled
+    valid = ~np.isnan(results["Cohen's d"].to_numpy())
+    rows = results[valid]
+    groups = [
+        (values[(row['Task Type'], row['Expertise Level 1'], row['Guidance Type 1'])],
+         values[(row['Task Type'], row['Expertise Level 2'], row['Guidance Type 2'])])
+        for _, row in rows.iterrows()
+    ]
+
+    ci_low = np.full(len(results), np.nan)
+    ci_high = np.full(len(results), np.nan)
+    dropped = np.full(len(results), np.nan)
+    p_values = np.full(len(results), np.nan)
+    if groups:
+        ci_low[valid], ci_high[valid], dropped[valid], p_values[valid] = np.array(
+            resample_comparisons(groups, executor, n_resamples, seed=seed)).T
+
+    results['d CI low'] = ci_low
+    results['d CI high'] = ci_high
+    results['Bootstrap dropped'] = dropped
+    results['Permutation p'] = p_values
+    return power_bands(ci_low, ci_high)
+
+def comparison_label(row):
+    return (f"{row['Task Type']}: {row['Expertise Level 1']}({row['Guidance Type 1']})"
+            f" vs {row['Expertise Level 2']}({row['Guidance Type 2']})")
+
+def comparison_filename(row):
+    parts = [row['Task Type'], row['Expertise Level 1'], row['Guidance Type 1'],
+             'vs', row['Expertise Level 2'], row['Guidance Type 2']]
+    return '_'.join(part.replace(' ', '-') for part in parts) + '.png'
+
+def write_results(results, powers, band_lower, band_upper, output_dir):
+    """Print a summary, save the results table and return the figure jobs
+    for _render_power_curve."""
+    figure_dir = os.path.join(output_dir, 'power_curves')
+    os.makedirs(figure_dir, exist_ok=True)
+
+    jobs = []
+    figure_paths = []
+    for i, row in results.iterrows():
+        label = comparison_label(row)
+        print(f"Checking {label} (n={row['n 1']} vs n={row['n 2']})")
+
+        d = row["Cohen's d"]
+        if min(row['n 1'], row['n 2']) < MIN_GROUP_SIZE:
+            print(f"Not enough data for power analysis for {label}. Skipping.\n")
+            figure_paths.append('')
+            continue
+        if np.isnan(d):
+            print(f"Cohen's d is undefined for {label}: both groups have no spread and equal means. Skipping.\n")
+            figure_paths.append('')
+            continue
+        if np.isinf(d):
+            print(f"Cohen's d = {d} for {label}: both groups have no spread but different means,"
+                  f" permutation p = {row['Permutation p']:.4f}. Skipping power curve.\n")
+            figure_paths.append('')
+            continue
+        if d == 0:
+            print(f"Cohen's d = 0 for {label}, no sample size reaches 80% power. Skipping.\n")
+            figure_paths.append('')
+            continue
+
+        print(f"Cohen's d = {d:.2f} ({DEFAULT_CONFIDENCE:.0%} CI {row['d CI low']:.2f} to {row['d CI high']:.2f}),"
+              f" permutation p = {row['Permutation p']:.4f}")
+        if row['Bootstrap dropped']:
+            print(f"{row['Bootstrap dropped']:.0f} bootstrap resamples without a defined d were dropped.")
+        print(f"Need ~{row['Required n']:.0f} samples per group for 80% power.\n")
+        path = os.path.join(figure_dir, comparison_filename(row))
+        band = (band_lower[i], band_upper[i]) if not np.isnan(row['d CI low']) else None
+        jobs.append((d, label, path, powers[i], row['Required n'], band))
+        figure_paths.append(path)
+
+    results['Figure'] = figure_paths
+    table_path = os.path.join(output_dir, 'effect_sizes.csv')
+    results.to_csv(table_path, index=False)
+    print(f"Results table saved to {table_path}")
+    return jobs
 
-        aoi1 = g1['Percentage AOI'].dropna().values
-        aoi2 = g2['Percentage AOI'].dropna().values
+def main(xlsx_file, output_dir, workers=None, n_resamples=DEFAULT_RESAMPLES, seed=None,
+         column=METRIC_COLUMN):
+    df = load_data(xlsx_file, column)
+    results, powers = pairwise_effect_sizes(group_stats(df, column))
+    results.insert(0, 'Metric', column)
 
-        print(f"Checking {task}: {exp1}({guide1}) n={len(aoi1)} vs {exp2}({guide2}) n={len(aoi2)}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        band_lower, band_upper = add_uncertainty(results, group_values(df, column), executor, n_resamples, seed)
+        jobs = write_results(results, powers, band_lower, band_upper, output_dir)
 
-        if len(aoi1) >= 2 and len(aoi2) >= 2:
-            d = cohens_d(aoi1, aoi2)
-            print(f"Running power analysis for {task}: Cohen's d = {d:.2f}")
-            power_curve_plot(d, f"{task}: {exp1} vs {exp2}")
-        else:
-            print(f"Not enough data for power analysis for {task}. Skipping.\n")
+        for path in executor.map(_render_power_curve, jobs):
+            print(f"Power curve saved to {path}")
 
 if __name__ == "__main__":
     import argparse
-    parser = argparse.ArgumentParser(description="Simple power analysis")
-    parser.add_argument('xlsx_file', type=str, help='Excel file with data')
+    parser = argparse.ArgumentParser(description="Power analysis over all study cells")
+    parser.add_argument('xlsx_file', type=str, help='Excel (or CSV) file with data')
+    parser.add_argument('--output_dir', type=str, default='power_analysis_results',
+                        help='Directory for the results table and power curve figures')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes used for resampling and rendering figures')
+    parser.add_argument('--n_resamples', type=int, default=DEFAULT_RESAMPLES,
+                        help='Bootstrap and permutation resamples per comparison')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed for reproducible resampling')
+    parser.add_argument('--metric_column', type=str, default=METRIC_COLUMN,
+                        help="Column to compare, e.g. 'Percentage AOI Dwell' for compute_aoi.py output")
     args = parser.parse_args()
 
-    main(args.xlsx_file)
+    main(args.xlsx_file, args.output_dir, args.workers, args.n_resamples, args.seed,
+         args.metric_column)
 
-# python analyze_effect_sizes.py Kidney_Eye_Gaze_Data.xlsx
\ No newline at end of file
+# python analyze_effect_sizes.py Kidney_Eye_Gaze_Data.xlsx
@@ -0,0 +1,174 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+GAZE_FILE_COLUMN = 'Gaze File'
+MAX_SAMPLE_GAP_MS = 1000  # longer gaps are tracking dropouts, not dwell time
+TRANSFORM_SIZE = 16
+# Time-weighted share of tracked gaze on the AOIs. This is not the hand-entered
+# 'Percentage AOI' of Kidney_Eye_Gaze_Data.xlsx (Calculated AOI / 6.8), so it
+# is written under its own name.
+DWELL_COLUMN = 'Percentage AOI Dwell'
+
+
+def load_aoi_definitions(json_file):
+    """Read the AOI definition file.
+
+    Expected layout (coordinates in the frame of the gaze transforms):
+        {
+            "forward_axis": 2,
+            "transform_index": 0,
+            "aois": [
+                {"name": "kidney", "type": "sphere", "center": [x, y, z], "radius": r},
+                {"name": "monitor", "type": "box", "min": [x, y, z], "max": [x, y, z]}
+            ]
+        }
+    """
+    with open(json_file) as f:
+        config = json.load(f)
+
+    config.setdefault('forward_axis', 2)
+    config.setdefault('transform_index', 0)
+    for aoi in config['aois']:
+        if aoi['type'] not in ('sphere', 'box'):
+            raise ValueError(f"Unknown AOI type '{aoi['type']}' for AOI '{aoi['name']}'")
+    return config
+
+def load_gaze_rays(csv_file, transform_index=0, forward_axis=2):
+    """Gaze ray origins, unit directions, timestamps and a validity mask
+    for every sample of a HoloLens gaze transform CSV.
+
+    Each row holds one or more row-major 4x4 transforms followed by a
+    timestamp in ms. The ray starts at the translation of the selected
+    transform and points along its forward_axis column.
+    """
+    data = pd.read_csv(csv_file, header=None).apply(pd.to_numeric, errors='coerce')
+    # A trailing delimiter leaves an empty last column
+    data = data.dropna(axis=1, how='all').to_numpy()
+    # Only rows without a time are unusable; a lost eye ray stays in as an
+    # invalid sample so its time is not credited to the previous one
+    data = data[np.isfinite(data[:, -1])]
+
+    start = transform_index * TRANSFORM_SIZE
+    transforms = data[:, start:start + TRANSFORM_SIZE].reshape(-1, 4, 4)
+    timestamps = data[:, -1]
+
+    origins = transforms[:, :3, 3]
+    directions = transforms[:, :3, forward_axis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+    # Samples without a valid eye ray (e.g. blinks) are logged as zeros or NaN
+    valid = np.isfinite(directions).all(axis=1) & np.isfinite(origins).all(axis=1)
+    return origins, directions, timestamps, valid
+
+def hit_sphere(origins, directions, center, radius):
+    """Whether each gaze ray hits a sphere in front of its origin"""
+    to_center = np.asarray(center, dtype=float) - origins
+    along = np.einsum('ij,ij->i', to_center, directions)
+    distance_sq = np.einsum('ij,ij->i', to_center, to_center)
+    inside = distance_sq <= radius**2
+    return inside | ((along >= 0) & (distance_sq - along**2 <= radius**2))
+
+def hit_box(origins, directions, box_min, box_max):
+    """Whether each gaze ray hits an axis-aligned box in front of its origin
+    (slab test)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1.0 / directions
+        t1 = (np.asarray(box_min, dtype=float) - origins) * inverse
+        t2 = (np.asarray(box_max, dtype=float) - origins) * inverse
+    # Rays parallel to a slab give NaN when starting on its boundary
+    t_near = np.nanmax(np.minimum(t1, t2), axis=1)
+    t_far = np.nanmin(np.maximum(t1, t2), axis=1)
+    return t_far >= np.maximum(t_near, 0)
+
+def aoi_hits(origins, directions, aoi):
+    if aoi['type'] == 'sphere':
+        return hit_sphere(origins, directions, aoi['center'], aoi['radius'])
+    return hit_box(origins, directions, aoi['min'], aoi['max'])
+
+def sample_durations(timestamps):
+    """Dwell time credited to each sample: the time until the next sample,
+    with dropouts and the final sample given the median interval."""
+    if len(timestamps) < 2:
+        return np.ones(len(timestamps))
+    gaps = np.diff(timestamps)
+    typical = np.median(gaps)
+    gaps = np.where((gaps < 0) | (gaps > MAX_SAMPLE_GAP_MS), typical, gaps)
+    return np.append(gaps, typical)
+
+def format_duration(milliseconds):
+    seconds = int(round(milliseconds / 1000))
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+def trial_aoi_percentages(job):
+    """AOI dwell percentages for one gaze transform CSV.
+
+    Durations come from all samples, so time spent in a blink is never
+    credited to the sample before it. Invalid samples never hit an AOI and
+    are left out of the total: percentages are shares of tracked gaze time,
+    and 'Percentage Tracked' reports how much of the trial that was.
+    """
+    csv_file, config = job
+    origins, directions, timestamps, valid = load_gaze_rays(
+        csv_file, config['transform_index'], config['forward_axis'])
+
+    result = {'Procedure Duration': np.nan, 'Percentage Tracked': np.nan, DWELL_COLUMN: np.nan}
+    if not valid.any():
+        print(f"No valid gaze samples in {csv_file}")
+        return result
+
+    durations = sample_durations(timestamps)
+    total = durations[valid].sum()
+    any_hit = np.zeros(len(timestamps), dtype=bool)
+    for aoi in config['aois']:
+        hits = np.zeros(len(timestamps), dtype=bool)
+        hits[valid] = aoi_hits(origins[valid], directions[valid], aoi)
+        any_hit |= hits
+        if len(config['aois']) > 1:
+            result[f"{DWELL_COLUMN} {aoi['name']}"] = 100 * durations[hits].sum() / total
+
+    result['Procedure Duration'] = format_duration(timestamps[-1] - timestamps[0])
+    result['Percentage Tracked'] = 100 * total / durations.sum()
+    result[DWELL_COLUMN] = 100 * durations[any_hit].sum() / total
+    return result
+
+def main(manifest_file, aoi_file, output_file, workers=None):
+    manifest = pd.read_csv(manifest_file)
+    manifest.columns = manifest.columns.str.strip()
+    config = load_aoi_definitions(aoi_file)
+
+    # Gaze file paths are relative to the manifest
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    gaze_files = [os.path.join(manifest_dir, path) for path in manifest[GAZE_FILE_COLUMN]]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(trial_aoi_percentages, [(path, config) for path in gaze_files]))
+
+    df = pd.concat([manifest.drop(columns=GAZE_FILE_COLUMN), pd.DataFrame(results)], axis=1)
+    if output_file.lower().endswith('.csv'):
+        df.to_csv(output_file, index=False)
+    else:
+        df.to_excel(output_file, index=False, engine='openpyxl')
+    print(f"AOI percentages for {len(df)} trials saved to {output_file}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compute AOI dwell percentages from raw gaze logs")
+    parser.add_argument('manifest_file', type=str,
+                        help=f"CSV listing each trial's '{GAZE_FILE_COLUMN}' and its study columns")
+    parser.add_argument('aoi_file', type=str, help='JSON file with AOI definitions')
+    parser.add_argument('--output_file', type=str, default='Kidney_Eye_Gaze_Data_computed.xlsx',
+                        help='Output spreadsheet (.xlsx or .csv)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes used to process trials')
+    args = parser.parse_args()
+
+    main(args.manifest_file, args.aoi_file, args.output_file, args.workers)
+
+# python compute_aoi.py trials.csv aoi_definitions.json
+# python analyze_effect_sizes.py Kidney_Eye_Gaze_Data_computed.xlsx --metric_column "Percentage AOI Dwell"
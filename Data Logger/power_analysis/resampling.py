@@ -0,0 +1,111 @@
+import numpy as np
+
+DEFAULT_RESAMPLES = 10000
+DEFAULT_CONFIDENCE = 0.95
+BATCH_SIZE = 5000  # resamples drawn per array operation, bounds memory use
+
+
+def cohens_d_from_stats(mean1, var1, n1, mean2, var2, n2):
+    """Cohen's d with pooled standard deviation from group summaries.
+
+    Arguments broadcast, so many comparisons are computed at once. Groups
+    with no spread give +/-inf when their means differ and NaN otherwise.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled_sd = np.sqrt(((n1 - 1)*var1 + (n2 - 1)*var2) / (n1 + n2 - 2))
+        return (mean1 - mean2) / pooled_sd
+
+def batched_cohens_d(x1, x2):
+    """Cohen's d along the last axis, for single groups or stacks of
+    resampled groups.
+
+    x1 and x2 have shapes (..., n1) and (..., n2); the result has shape (...).
+    """
+    x1, x2 = np.asarray(x1, dtype=float), np.asarray(x2, dtype=float)
+    return cohens_d_from_stats(
+        np.mean(x1, axis=-1), np.var(x1, axis=-1, ddof=1), x1.shape[-1],
+        np.mean(x2, axis=-1), np.var(x2, axis=-1, ddof=1), x2.shape[-1],
+    )
+
+def _batches(n_resamples):
+    for start in range(0, n_resamples, BATCH_SIZE):
+        yield min(BATCH_SIZE, n_resamples - start)
+
+def bootstrap_d(x1, x2, n_resamples=DEFAULT_RESAMPLES, rng=None):
+    """Bootstrap distribution of Cohen's d, resampling each group with
+    replacement independently."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = np.asarray(x1, dtype=float), np.asarray(x2, dtype=float)
+
+    samples = []
+    for size in _batches(n_resamples):
+        idx1 = rng.integers(0, len(x1), size=(size, len(x1)))
+        idx2 = rng.integers(0, len(x2), size=(size, len(x2)))
+        samples.append(batched_cohens_d(x1[idx1], x2[idx2]))
+    return np.concatenate(samples)
+
+def bootstrap_ci(x1, x2, n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, rng=None):
+    """Percentile bootstrap confidence interval for Cohen's d.
+
+    Returns (low, high, dropped). Resamples where both groups are constant
+    with equal means have no d and are dropped; constant groups with
+    different means give +/-inf, the most extreme d, and are kept. Bounds
+    are order statistics so that infinite samples are handled.
+    """
+    samples = bootstrap_d(x1, x2, n_resamples, rng)
+    defined = ~np.isnan(samples)
+    dropped = int(len(samples) - np.count_nonzero(defined))
+    samples = samples[defined]
+    if len(samples) == 0:
+        return np.nan, np.nan, dropped
+    tail = (1 - confidence) / 2 * 100
+    low = np.percentile(samples, tail, method='lower')
+    high = np.percentile(samples, 100 - tail, method='higher')
+    return low, high, dropped
+
+def permutation_test(x1, x2, n_resamples=DEFAULT_RESAMPLES, rng=None):
+    """Two-sided permutation-test p-value for Cohen's d, shuffling group
+    labels over the pooled observations."""
+    rng = np.random.default_rng(rng)
+    x1, x2 = np.asarray(x1, dtype=float), np.asarray(x2, dtype=float)
+    observed = abs(batched_cohens_d(x1, x2))
+    if np.isnan(observed):
+        return np.nan
+
+    pooled = np.concatenate([x1, x2])
+    n1 = len(x1)
+
+    extreme = 0
+    for size in _batches(n_resamples):
+        shuffled = np.tile(pooled, (size, 1))
+        rng.permuted(shuffled, axis=1, out=shuffled)
+        d = np.abs(batched_cohens_d(shuffled[:, :n1], shuffled[:, n1:]))
+        # Small tolerance so permutations equal to the observed split count
+        extreme += np.count_nonzero(d >= observed - 1e-12)
+    return (extreme + 1) / (n_resamples + 1)
+
+def resample_comparison(job):
+    """Bootstrap CI, number of dropped bootstrap resamples and permutation
+    p-value for one comparison.
+
+    job is (x1, x2, n_resamples, confidence, seed) so that comparisons can be
+    distributed over a process pool.
+    """
+    x1, x2, n_resamples, confidence, seed = job
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    boot_rng, perm_rng = [np.random.default_rng(s) for s in seed.spawn(2)]
+    low, high, dropped = bootstrap_ci(x1, x2, n_resamples, confidence, boot_rng)
+    p_value = permutation_test(x1, x2, n_resamples, perm_rng)
+    return low, high, dropped, p_value
+
+def resample_comparisons(groups, executor, n_resamples=DEFAULT_RESAMPLES,
+                         confidence=DEFAULT_CONFIDENCE, seed=None):
+    """Run resample_comparison for a list of (x1, x2) pairs on an executor.
+
+    Every comparison gets an independent random stream derived from seed, so
+    results are reproducible regardless of how work is scheduled.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+    jobs = [(x1, x2, n_resamples, confidence, s) for (x1, x2), s in zip(groups, seeds)]
+    return list(executor.map(resample_comparison, jobs))
@@ -0,0 +1,32 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+pytest.importorskip("statsmodels")
+
+from analyze_effect_sizes import group_stats, load_data  # noqa: E402
+
+
+def test_group_stats_one_row_per_cell(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "Task Type,Expertise Level,Guidance Type,Percentage AOI,Percentage AOI Dwell\n"
+        "Scoping,Expert,SelfGaze,20,40\n"
+        "scoping,expert,selfgaze ,30,50\n"
+        "scoping,novice,guided,10,35\n"
+        "scoping,novice,guided,15,30\n"
+        "ablating,novice,unguided,25,20\n"
+        ",novice,unguided,99,99\n"
+    )
+
+    for column in ["Percentage AOI", "Percentage AOI Dwell"]:
+        df = load_data(str(csv_path), column)
+        stats = group_stats(df, column)
+
+        cells = set(zip(stats['Task Type'], stats['Expertise Level'], stats['Guidance Type']))
+        assert cells == {
+            ("scoping", "expert", "selfgaze"),
+            ("scoping", "novice", "guided"),
+            ("ablating", "novice", "unguided"),
+        }
+        assert stats['n'].sum() == 5
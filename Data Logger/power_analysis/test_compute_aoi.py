@@ -0,0 +1,33 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from compute_aoi import DWELL_COLUMN, trial_aoi_percentages  # noqa: E402
+
+
+def gaze_row(direction, timestamp):
+    """Row-major 4x4 transform at the origin with the given z axis"""
+    transform = np.eye(4)
+    transform[:3, 2] = direction
+    return ",".join(str(v) for v in transform.flatten()) + f",{timestamp}"
+
+
+def test_lost_rays_are_not_counted_as_dwell(tmp_path):
+    csv_path = tmp_path / "gaze.csv"
+    csv_path.write_text("\n".join([
+        gaze_row([0, 0, 1], 0),                    # on the AOI
+        gaze_row([np.nan, np.nan, np.nan], 10),    # lost ray
+        gaze_row([0, 0, 0], 20),                   # blink logged as zeros
+        gaze_row([0, 0, -1], 30),                  # away from the AOI
+    ]) + "\n")
+    config = {
+        'forward_axis': 2,
+        'transform_index': 0,
+        'aois': [{'name': 'target', 'type': 'sphere', 'center': [0, 0, 5], 'radius': 1}],
+    }
+
+    result = trial_aoi_percentages((str(csv_path), config))
+
+    assert result[DWELL_COLUMN] == pytest.approx(50)
+    assert result['Percentage Tracked'] == pytest.approx(50)
@@ -0,0 +1,80 @@
+import struct
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from frame_index import FrameReader, MISSING_FRAME, load_timestamps, scan_avi  # noqa: E402
+
+
+def write_clip(path, n_frames=12, size=(64, 48)):
+    """Write a short MJPG clip whose frames are distinguishable by colour"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 30, size)
+    for i in range(n_frames):
+        frame = np.full((size[1], size[0], 3), i * 20, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def test_scan_matches_videocapture(tmp_path):
+    avi_path = tmp_path / "clip.avi"
+    write_clip(avi_path)
+
+    cap = cv2.VideoCapture(str(avi_path))
+    expected = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        expected.append(frame)
+    cap.release()
+
+    assert len(scan_avi(str(avi_path))) == len(expected)
+    with FrameReader(str(avi_path)) as reader:
+        for frame_no in [5, 0, len(expected) - 1, 3]:
+            np.testing.assert_array_equal(reader[frame_no], expected[frame_no])
+
+
+def test_dropped_first_frame_keeps_alignment(tmp_path):
+    jpeg = cv2.imencode(".jpg", np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+    if len(jpeg) % 2:
+        jpeg += b"\0"
+    chunks = struct.pack("<4sI", b"00dc", 0) + struct.pack("<4sI", b"00dc", len(jpeg)) + jpeg
+    movi = b"LIST" + struct.pack("<I", 4 + len(chunks)) + b"movi" + chunks
+    avi_path = tmp_path / "dropped.avi"
+    avi_path.write_bytes(b"RIFF" + struct.pack("<I", 4 + len(movi)) + b"AVI " + movi)
+
+    index = scan_avi(str(avi_path))
+    assert len(index) == 2
+    assert index[0][0] == MISSING_FRAME
+
+    with FrameReader(str(avi_path)) as reader:
+        with pytest.raises(IndexError):
+            reader.read_bytes(0)
+        assert reader[1].shape == (8, 8, 3)
+
+
+def test_cached_frames_are_read_only(tmp_path):
+    avi_path = tmp_path / "clip.avi"
+    write_clip(avi_path)
+
+    with FrameReader(str(avi_path)) as reader:
+        frame = reader[2]
+        with pytest.raises(ValueError):
+            frame[0, 0] = 255
+        np.testing.assert_array_equal(reader[2], frame)
+
+
+def test_timestamps_indexed_by_frame_number(tmp_path):
+    csv_path = tmp_path / "clip.csv"
+    csv_path.write_text("1,1010\n0,1000\n2,1020\n")
+    np.testing.assert_array_equal(load_timestamps(str(csv_path), 5), [1000, 1010, 1020])
+
+    csv_path.write_text("0,1000\n2,1020\n")
+    with pytest.raises(ValueError):
+        load_timestamps(str(csv_path), 5)
+
+    csv_path.write_text("0,1000\n1,1010\n1,1015\n")
+    with pytest.raises(ValueError):
+        load_timestamps(str(csv_path), 5)